@@ -5,7 +5,13 @@ import google.generativeai as genai
 from dotenv import load_dotenv
 from elevenlabs.client import ElevenLabs
 import queue
+import random
+import threading
+import wave
+from array import array
+from itertools import chain
 import sounddevice as sd # <-- Replaces other audio libraries
+from speech_sanitizer import SpeechSanitizer
 
 # --- 1. CONFIGURATION ---
 # Load environment variables from .env file
@@ -18,6 +24,18 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID")
 
+# Optional filler audio, played from assets/fillers/ while a slow reply is outstanding
+FILLER_AUDIO_ENABLED = os.getenv("FILLER_AUDIO_ENABLED", "false").lower() in ("1", "true", "yes")
+FILLER_THRESHOLD_SECONDS = float(os.getenv("FILLER_THRESHOLD_SECONDS", "1.5"))
+
+# Audio format shared by ElevenLabs' 'pcm_24000' output and the filler clips
+SAMPLE_RATE = 24000
+BYTES_PER_SAMPLE = 2
+FILLER_BLOCK_BYTES = SAMPLE_RATE // 50 * BYTES_PER_SAMPLE # 20 ms per write
+CROSSFADE_BYTES = SAMPLE_RATE * 150 // 1000 * BYTES_PER_SAMPLE # 150 ms cross-fade
+FILLER_SILENCE_LEVEL = 500 # Peak amplitude below which a filler block counts as a pause
+FILLER_PAUSE_WAIT_BYTES = SAMPLE_RATE * 200 // 1000 * BYTES_PER_SAMPLE # Longest wait for a pause before cross-fading
+
 # Validate that all necessary environment variables are set
 if not all([AZURE_SPEECH_KEY, AZURE_SPEECH_REGION, GEMINI_API_KEY, ELEVENLABS_API_KEY, ELEVENLABS_VOICE_ID]):
     raise ValueError("One or more required environment variables are not set. Please check your .env file.")
@@ -26,6 +44,163 @@ if not all([AZURE_SPEECH_KEY, AZURE_SPEECH_REGION, GEMINI_API_KEY, ELEVENLABS_AP
 genai.configure(api_key=GEMINI_API_KEY)
 
 
+def load_pcm_clip(file_path):
+    """
+    Reads a WAV file as raw PCM bytes.
+    Returns None unless the clip is 24 kHz, mono, 16-bit to match the ElevenLabs stream.
+    """
+    with wave.open(file_path, 'rb') as wav:
+        if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, 1, BYTES_PER_SAMPLE):
+            return None
+        return wav.readframes(wav.getnframes())
+
+
+def crossfade_chunks(chunks, tail):
+    """
+    Yields the reply's PCM chunks, fading them in over the unplayed filler
+    tail as it fades out. Chunks are passed through untouched once the tail is used up.
+    """
+    fade_out = array('h', tail)
+    position = 0
+    pending = b""
+    for chunk in chunks:
+        data = pending + chunk
+        if position >= len(fade_out):
+            pending = b""
+            yield data
+            continue
+        # Only whole samples can be mixed; carry an odd trailing byte forward
+        usable = len(data) - len(data) % BYTES_PER_SAMPLE
+        pending = data[usable:]
+        samples = array('h', data[:usable])
+        for i in range(min(len(samples), len(fade_out) - position)):
+            gain = (position + i) / len(fade_out)
+            mixed = samples[i] * gain + fade_out[position + i] * (1 - gain)
+            samples[i] = max(-32768, min(32767, int(mixed)))
+        position += len(samples)
+        if samples:
+            yield samples.tobytes()
+    if pending:
+        yield pending
+
+
+def batch_segments(segments):
+    """
+    Reads text segments on a background thread and yields the first one on its
+    own, then everything that has queued up while the previous batch was spoken.
+    The first sentence reaches TTS straight away without a request per sentence.
+    """
+    pending = queue.Queue()
+
+    def read():
+        try:
+            for segment in segments:
+                if segment:
+                    pending.put(segment)
+        finally:
+            pending.put(None)
+
+    threading.Thread(target=read, daemon=True).start()
+    finished = False
+    while not finished:
+        batch = [pending.get()]
+        if batch[0] is None:
+            return
+        while True:
+            try:
+                segment = pending.get_nowait()
+            except queue.Empty:
+                break
+            if segment is None:
+                finished = True
+                break
+            batch.append(segment)
+        yield "".join(batch)
+
+
+class FillerPlayback:
+    """
+    Plays a pre-synthesized filler clip if the reply's first audio takes longer
+    than the threshold, then hands its open audio stream over to the reply.
+    """
+    def __init__(self, clip, threshold, log):
+        """
+        Starts waiting for the threshold on a background thread.
+        :param clip: Raw 24 kHz mono 16-bit PCM bytes.
+        :param threshold: Seconds to wait before the filler starts playing.
+        :param log: Callable used to report playback errors.
+        """
+        self.clip = clip
+        self.position = 0
+        self.stream = None
+        self.log = log
+        # Block offsets where the clip is quiet enough to hand over without cutting a word
+        self._pauses = sorted(
+            offset for offset in range(0, len(clip), FILLER_BLOCK_BYTES)
+            if max(map(abs, array('h', clip[offset:offset + FILLER_BLOCK_BYTES]))) < FILLER_SILENCE_LEVEL
+        ) + [len(clip)]
+        self._at_pause = False
+        self._handing_over = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._play, args=(threshold,), daemon=True)
+        self._thread.start()
+
+    def _play(self, threshold):
+        """Writes the clip in small blocks so it can be interrupted quickly."""
+        if self._handing_over.wait(threshold) or self._stopped.is_set():
+            return
+        stream = None
+        hand_over_at = None
+        try:
+            stream = sd.RawOutputStream(samplerate=SAMPLE_RATE, channels=1, dtype='int16')
+            stream.start()
+            self.stream = stream
+            while not self._stopped.is_set() and self.position < len(self.clip):
+                if self._handing_over.is_set():
+                    # Finish the word if a pause is close, otherwise cross-fade right away
+                    if hand_over_at is None:
+                        hand_over_at = next((offset for offset in self._pauses if offset >= self.position), None)
+                        if hand_over_at is None or hand_over_at - self.position > FILLER_PAUSE_WAIT_BYTES:
+                            break
+                    if self.position >= hand_over_at:
+                        self._at_pause = True
+                        break
+                block = self.clip[self.position:self.position + FILLER_BLOCK_BYTES]
+                stream.write(block)
+                self.position += len(block)
+        except Exception as e:
+            # Never hand a broken stream to the reply
+            self.stream = None
+            if stream is not None:
+                stream.close(ignore_errors=True)
+            self.log(f"An error occurred during filler playback: {e}")
+
+    def hand_over(self):
+        """
+        Stops the filler, at its next pause if one is within 200 ms, and returns
+        its open stream (or None if it never started) along with any unplayed
+        audio to cross-fade with the reply.
+        """
+        self._handing_over.set()
+        self._thread.join()
+        stream, self.stream = self.stream, None
+        if stream is None:
+            return None, b""
+        if self._at_pause:
+            return stream, b""
+        return stream, self.clip[self.position:self.position + CROSSFADE_BYTES]
+
+    def stop(self):
+        """Stops the filler immediately and closes its stream."""
+        self._stopped.set()
+        self._handing_over.set()
+        self._thread.join()
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+
+
 class ConversationalAI:
     """
     Manages the conversational AI logic, separating it from the UI.
@@ -38,6 +213,7 @@ class ConversationalAI:
         self.chat_session = None
         self.is_running = False
         self.update_queue = update_queue
+        self.filler_clips = []
 
     def _send_update(self, msg_type, value):
         """Helper to send updates to the GUI thread."""
@@ -54,6 +230,40 @@ class ConversationalAI:
             self._send_update("log", f"⚠️ Warning: Persona file '{file_path}' not found.")
             return "You are a helpful AI assistant."
 
+    def load_filler_clips(self, persona_name):
+        """
+        Loads pre-synthesized filler clips for a persona from assets/fillers/<persona>/,
+        falling back to any clips directly in assets/fillers/.
+        """
+        clips = []
+        for folder in [os.path.join("assets", "fillers", persona_name), os.path.join("assets", "fillers")]:
+            if not os.path.isdir(folder):
+                continue
+            for file_name in sorted(os.listdir(folder)):
+                if not file_name.lower().endswith(".wav"):
+                    continue
+                try:
+                    clip = load_pcm_clip(os.path.join(folder, file_name))
+                except (OSError, wave.Error) as e:
+                    self._send_update("log", f"⚠️ Warning: Could not read filler '{file_name}': {e}")
+                    continue
+                if clip is None:
+                    self._send_update("log", f"⚠️ Warning: Filler '{file_name}' must be 24 kHz mono 16-bit WAV.")
+                    continue
+                clips.append(clip)
+            if clips:
+                break
+        if clips:
+            self._send_update("log", f"🔈 Loaded {len(clips)} filler clip(s).")
+        return clips
+
+    def start_filler(self):
+        """Starts a filler that plays if the reply's first audio is slower than the threshold."""
+        if not self.filler_clips:
+            return None
+        log = lambda message: self._send_update("log", message)
+        return FillerPlayback(random.choice(self.filler_clips), FILLER_THRESHOLD_SECONDS, log)
+
     def start_session(self, persona_name):
         """Initializes a new chat session with a given persona."""
         self._send_update("status", "Initializing...")
@@ -65,6 +275,7 @@ class ConversationalAI:
             {'role': 'user', 'parts': [persona_prompt]},
             {'role': 'model', 'parts': ["Understood. I will now respond as this persona."]}
         ])
+        self.filler_clips = self.load_filler_clips(persona_name) if FILLER_AUDIO_ENABLED else []
         self.is_running = True
         self._send_update("status", f"Ready to chat as {persona_name}. Say something!")
         self._send_update("session_started", None)
@@ -103,48 +314,106 @@ class ConversationalAI:
         return ""
 
     def get_gemini_response(self, question):
-        """Gets a contextual response from the Gemini chat session."""
+        """
+        Streams a contextual response from the Gemini chat session, yielding it
+        a sentence at a time as it arrives, stripped of anything that shouldn't be spoken.
+        """
         self._send_update("status", "🧠 Thinking...")
+        # stop_session() may clear self.chat_session from the GUI thread mid-turn
+        session = self.chat_session
+        sanitizer = SpeechSanitizer()
+        history = None
+        spoken_parts = []
         try:
-            response = self.chat_session.send_message(question)
-            full_response = "".join(part.text for part in response.parts)
-            self._send_update("log", f"🤖 Bot: {full_response}")
-            return full_response
+            history = list(session.history)
+            response = session.send_message(question, stream=True)
+            for chunk in response:
+                segment = sanitizer.feed("".join(part.text for part in chunk.parts))
+                if segment:
+                    spoken_parts.append(segment)
+                    yield segment
+            segment = sanitizer.flush()
+            if segment:
+                spoken_parts.append(segment)
+                yield segment
         except Exception as e:
+            # A broken or blocked stream stays attached to the session and makes every later
+            # send_message fail, so rewind to the history from before this question
+            if history is not None and self.chat_session is session:
+                self.chat_session = session.model.start_chat(history=history)
             self._send_update("log", f"An error occurred with the Gemini API: {e}")
-            return "Sorry, I'm having trouble thinking right now."
+            yield "Sorry, I'm having trouble thinking right now."
+            return
+        self._send_update("log", f"🤖 Bot: {''.join(spoken_parts)}")
+        if sanitizer.removed:
+            self._send_update("log", f"✂️ Removed {sanitizer.removed} non-spoken characters.")
 
     # --- REWRITTEN FOR STREAMING WITH SOUNDDEVICE ---
-    def speak_text_with_elevenlabs(self, text):
+    def speak_text_with_elevenlabs(self, text, filler=None):
         """
         Streams audio directly from ElevenLabs to the speakers using the
         'sounddevice' library for low-latency playback.
+        :param text: A string, or an iterable of text segments that are spoken
+            as they arrive instead of waiting for the whole reply.
+        :param filler: Optional FillerPlayback that plays on until the first audio
+            chunk arrives and is then cross-faded into the reply.
         """
         if not text or not ELEVENLABS_API_KEY or not ELEVENLABS_VOICE_ID or not self.is_running:
+            if filler:
+                filler.stop()
             return
-        
-        self._send_update("status", "💬 Speaking...")
+
+        batches = [text] if isinstance(text, str) else batch_segments(text)
+        stream = None
+        spoken = ""
         try:
             client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
-            
-            # Request a stream of raw PCM audio data
-            audio_stream = client.text_to_speech.stream(
-                text=text,
-                voice_id=ELEVENLABS_VOICE_ID,
-                model_id="eleven_multilingual_v2",
-                output_format="pcm_24000"
-            )
-            
-            # Use sounddevice to play the raw PCM stream
-            with sd.RawOutputStream(samplerate=24000, channels=1, dtype='int16') as stream:
-                for chunk in audio_stream:
-                    if chunk and self.is_running:
-                        stream.write(chunk)
-                    else:
+
+            # Every batch is played on the same output stream, so there's no
+            # gap between batches beyond the TTS request itself
+            for batch in batches:
+                if not self.is_running:
+                    break
+
+                # Request a stream of raw PCM audio data, passing what's already
+                # been said so the voice carries on naturally between requests
+                context = {"previous_text": spoken} if spoken else {}
+                audio_stream = iter(client.text_to_speech.stream(
+                    text=batch,
+                    voice_id=ELEVENLABS_VOICE_ID,
+                    model_id="eleven_multilingual_v2",
+                    output_format="pcm_24000",
+                    **context
+                ))
+                spoken += batch
+
+                # Keep any filler playing until the reply's first audio is ready
+                first_chunk = next((chunk for chunk in audio_stream if chunk), b"")
+                if not first_chunk:
+                    continue
+                tail = b""
+                if stream is None:
+                    self._send_update("status", "💬 Speaking...")
+                    stream, tail = filler.hand_over() if filler else (None, b"")
+                    if stream is None:
+                        stream = sd.RawOutputStream(samplerate=SAMPLE_RATE, channels=1, dtype='int16')
+                        stream.start()
+
+                # Use sounddevice to play the raw PCM stream
+                for chunk in crossfade_chunks(chain([first_chunk], audio_stream), tail):
+                    if not self.is_running:
                         break # Stop playback if session ends
+                    if chunk:
+                        stream.write(chunk)
 
         except Exception as e:
             self._send_update("log", f"An error occurred during audio streaming: {e}")
+        finally:
+            if filler:
+                filler.stop()
+            if stream is not None:
+                stream.stop()
+                stream.close()
 
     def run_conversation_loop(self):
         """Runs the main conversation loop, continuously listening."""
@@ -163,5 +432,6 @@ class ConversationalAI:
                 self.stop_session()
                 break
 
-            answer_text = self.get_gemini_response(question_text)
-            self.speak_text_with_elevenlabs(answer_text)
\ No newline at end of file
+            filler = self.start_filler()
+            answer_segments = self.get_gemini_response(question_text)
+            self.speak_text_with_elevenlabs(answer_segments, filler)
\ No newline at end of file
@@ -0,0 +1,188 @@
+import re
+import unicodedata
+
+# Markup that shouldn't be read aloud
+BRACKETS = {"(": ")", "[": "]", "{": "}"}
+SENTENCE_ENDS = ".!?"
+PUNCTUATION = ".,!?;:"
+STAGE_DIRECTION_LIMIT = 200 # Longest bracketed span treated as a stage direction
+SENTENCE_BOUNDARY = re.compile(r"\n|[.!?]\s+")
+LINE_MARKER = re.compile(r"^[ \t]*(?:#{1,6}|[-*+•>])[ \t]+")
+NUMBERED_ITEM = re.compile(r"^[ \t]*\d+[.)][ \t]+")
+BOLD_LINE = re.compile(r"^([ \t]*)(\*\*|__)([^\n]+?)\2[ \t]*$", re.MULTILINE)
+DOUBLE_EMPHASIS = re.compile(r"\*\*|__")
+EMPHASIS = re.compile(r"(?<![\w*`])([*_`])(?=\S)([^\n]+?)(?<=\S)\1(?![\w*`])")
+LINK = re.compile(r"\[([^\[\]\n]+)\]\([^()\s]+\)")
+EMOJI_RANGES = ((0x2600, 0x27BF), (0x2B00, 0x2BFF), (0x1F000, 0x1FAFF))
+
+
+def is_emoji(char):
+    """Returns True for emoji and the joiners/selectors used to build them."""
+    code = ord(char)
+    if char in ("\u200d", "\ufe0f") or unicodedata.category(char) == "Cf":
+        return True
+    return any(low <= code <= high for low, high in EMOJI_RANGES)
+
+
+def bracket_spans(text):
+    """
+    Returns (start, end) pairs for the outermost matched brackets in text,
+    plus the positions of any opening brackets left unmatched.
+    """
+    stack = []
+    spans = []
+    for index, char in enumerate(text):
+        if char in BRACKETS:
+            stack.append((char, index))
+        elif stack and char == BRACKETS[stack[-1][0]]:
+            spans.append((stack.pop()[1], index + 1))
+    outermost = []
+    for start, end in sorted(spans):
+        if not outermost or start >= outermost[-1][1]:
+            outermost.append((start, end))
+    return outermost, [index for _, index in stack]
+
+
+class SpeechSanitizer:
+    """
+    Incrementally strips text that shouldn't be spoken before it reaches
+    ElevenLabs: stage directions like "(Sound of typing)" or "*Sighs*",
+    markdown, emoji and list markers. Text is released a sentence or line at
+    a time as it arrives; call flush() once the reply is complete.
+    """
+    def __init__(self):
+        self.removed = 0
+        self._buffer = ""
+        self._at_line_start = True
+        self._line_is_item = False # Heading or list lines end with a sentence break
+        self._last = "" # Last character emitted
+        self._separator = "" # Space (or sentence break) owed before the next word
+        self._whitespace = 0 # Whitespace characters the separator stands in for
+
+    def feed(self, text):
+        """Sanitizes the next chunk of text and returns whatever is ready to speak."""
+        self._buffer += text
+        out = []
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(self._buffer):
+            # Hold the cut while a recent bracket is still open, so a stage
+            # direction that wraps across lines or sentences stays in one piece
+            end = match.end()
+            openers = bracket_spans(self._buffer[start:end])[1]
+            if any(end - start - opener <= STAGE_DIRECTION_LIMIT for opener in openers):
+                continue
+            out.append(self._sanitize(self._buffer[start:end]))
+            start = end
+        self._buffer = self._buffer[start:]
+        return "".join(out)
+
+    def flush(self):
+        """Returns any held-back text once the reply is complete."""
+        segment, self._buffer = self._buffer, ""
+        text = self._sanitize(segment)
+        self.removed += self._whitespace
+        self._separator = ""
+        self._whitespace = 0
+        return text
+
+    def _sanitize(self, segment):
+        segment = BOLD_LINE.sub(self._bold_line_to_heading, segment)
+        segment = self._remove_matches(DOUBLE_EMPHASIS, segment, lambda match: "")
+        segment = self._remove_matches(LINK, segment, lambda match: match.group(1))
+        emoji = sum(1 for char in segment if is_emoji(char))
+        if emoji:
+            self.removed += emoji
+            segment = "".join(char for char in segment if not is_emoji(char))
+        sentence_start = self._at_line_start or not self._last or self._last in SENTENCE_ENDS
+        segment = self._drop_stage_directions(segment, sentence_start)
+
+        out = []
+        for line in segment.splitlines(keepends=True):
+            body = line.rstrip("\r\n")
+            ends_line = body != line
+            if self._at_line_start:
+                marker = LINE_MARKER.match(body)
+                if marker:
+                    self.removed += marker.end()
+                    body = body[marker.end():]
+                self._line_is_item = bool(marker or NUMBERED_ITEM.match(body))
+                self._at_line_start = False
+            body = self._remove_matches(EMPHASIS, body, lambda match: match.group(2))
+            self._append(body, out)
+            if ends_line:
+                self._newline()
+        return "".join(out)
+
+    def _remove_matches(self, pattern, text, replacement):
+        def replace(match):
+            kept = replacement(match)
+            self.removed += len(match.group()) - len(kept)
+            return kept
+        return pattern.sub(replace, text)
+
+    def _bold_line_to_heading(self, match):
+        """Rewrites a fully bolded line as a heading so it ends with a sentence break."""
+        if match.start() == 0 and not self._at_line_start:
+            return match.group()
+        heading = f"{match.group(1)}# {match.group(3)}"
+        self.removed += len(match.group()) - len(heading)
+        return heading
+
+    def _drop_stage_directions(self, text, sentence_start):
+        """
+        Drops bracketed or single-emphasis spans that stand alone as a sentence
+        or line, like "(Sound of typing)" or "*Sighs*"; other asides are kept.
+        """
+        spans = bracket_spans(text)[0]
+        spans += [
+            match.span() for match in EMPHASIS.finditer(text)
+            if match.group(1) != "`" and not any(start < match.end() and match.start() < end for start, end in spans)
+        ]
+        result = ""
+        position = 0
+        for start, end in sorted(spans):
+            if start < position or end - start > STAGE_DIRECTION_LIMIT:
+                continue
+            before = result + text[position:start]
+            context = before.rstrip(" \t")
+            after = text[end:].lstrip(" \t")
+            opens_sentence = context[-1] in SENTENCE_ENDS + "\n" if context else sentence_start
+            closes_sentence = not after or after[0] in SENTENCE_ENDS + "\n([{*_" or after[0].isupper()
+            if not (opens_sentence and closes_sentence):
+                continue
+            result = before
+            position = end
+            # "Sure. (typing)." shouldn't leave a doubled full stop behind
+            if after[:1] and after[0] in SENTENCE_ENDS and (not context or context[-1] in SENTENCE_ENDS + "\n"):
+                position = len(text) - len(after) + 1
+            self.removed += position - start
+        return result + text[position:]
+
+    def _append(self, text, out):
+        for index, char in enumerate(text):
+            if char.isspace():
+                self._whitespace += 1
+                self._separator = self._separator or " "
+                continue
+            if self._whitespace or self._separator:
+                # Drop the space left before trailing punctuation, but keep it before ":(" and the like
+                following = text[index + 1:index + 2]
+                closes_word = char in PUNCTUATION and (not following or following.isspace())
+                if self._last and not closes_word:
+                    out.append(self._separator)
+                    self.removed += max(0, self._whitespace - 1)
+                else:
+                    self.removed += self._whitespace
+                self._separator = ""
+                self._whitespace = 0
+            out.append(char)
+            self._last = char
+
+    def _newline(self):
+        self._whitespace += 1
+        if self._line_is_item and self._last and self._last not in PUNCTUATION:
+            self._separator = ". "
+        else:
+            self._separator = self._separator or " "
+        self._at_line_start = True
+        self._line_is_item = False
@@ -0,0 +1,76 @@
+import pytest
+
+from speech_sanitizer import SpeechSanitizer
+
+CHUNK_SIZES = [1, 3, 7, None]
+
+
+def sanitize(text, chunk_size=None):
+    """Feeds text through a fresh sanitizer in chunks and returns (spoken text, removed count)."""
+    sanitizer = SpeechSanitizer()
+    chunk_size = chunk_size or len(text) or 1
+    spoken = "".join(sanitizer.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size))
+    spoken += sanitizer.flush()
+    return spoken, sanitizer.removed
+
+
+CASES = [
+    # Stage directions that stand alone are dropped
+    ("Hi there! (Sound of typing) Let me check.", "Hi there! Let me check."),
+    ("(Sound of typing) Okay, I see it. (pause) Right.", "Okay, I see it. Right."),
+    ("Sure. (typing).\n[laughs]\nOkay then.", "Sure. Okay then."),
+    ("Hello.\n(Sound of\ntyping)\nOkay.", "Hello. Okay."),
+    ("*Sighs* Okay, let me look.", "Okay, let me look."),
+    # Ordinary asides and stray brackets are kept
+    ("I need access (urgently) now.", "I need access (urgently) now."),
+    ("Then (a (b) c) end.", "Then (a (b) c) end."),
+    ("Sorry :( let me check (typing) ok, done.", "Sorry :( let me check (typing) ok, done."),
+    ("It's 25°C, (unclosed aside", "It's 25°C, (unclosed aside"),
+    # Lists and headings become sentences; wrapped prose doesn't
+    ("## Next steps\n- Call the bank\n- Check your email\n1. Done.",
+     "Next steps. Call the bank. Check your email. 1. Done."),
+    ("  Sure.\n\n* item one\n* item two\n", "Sure. item one. item two"),
+    ("**Step one**\nDo this.", "Step one. Do this."),
+    ("Line one\nline two", "Line one line two"),
+    # Emphasis is unwrapped only when paired
+    ("Let me **check** that for `you`.", "Let me check that for you."),
+    ("Okay. **Important: do this. Then that.** Done.", "Okay. Important: do this. Then that. Done."),
+    ("My username is john_smith and 2*3=6.", "My username is john_smith and 2*3=6."),
+    # Links keep their text
+    ("Go to [the reset page](https://x.com) now.", "Go to the reset page now."),
+    # Emoji are dropped without leaving a gap before punctuation
+    ("Great 😀👍🏽 thanks.", "Great thanks."),
+    ("Hello 👋.", "Hello."),
+]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text, expected", CASES)
+def test_sanitized_text(text, expected, chunk_size):
+    assert sanitize(text, chunk_size)[0] == expected
+
+
+@pytest.mark.parametrize("text, _", CASES)
+def test_output_does_not_depend_on_chunk_size(text, _):
+    results = {sanitize(text, chunk_size) for chunk_size in CHUNK_SIZES}
+    assert len(results) == 1
+
+
+@pytest.mark.parametrize("text, removed", [
+    ("Plain text.", 0),
+    ("Line one\nline two", 0),
+    ("Hello (pause) there.", 0),
+    ("Sure. (typing) Okay.", len("(typing) ")),
+    ("- a\n- b", 4),
+    ("Let me **check**.", 4),
+    ("Hello 👋.", 2),
+])
+def test_removed_counts_dropped_characters(text, removed):
+    assert sanitize(text)[1] == removed
+
+
+def test_sentences_are_released_before_the_reply_ends():
+    sanitizer = SpeechSanitizer()
+    assert sanitizer.feed("First sentence. Sec") == "First sentence."
+    assert sanitizer.feed("ond one") == ""
+    assert sanitizer.flush() == " Second one"